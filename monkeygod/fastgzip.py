@@ -0,0 +1,15 @@
+"""The gzip implementation used to read and write the H3 CSVs
+
+ISA-L's accelerated drop-in for the gzip module is used when ``isal`` is installed,
+otherwise the standard library's.
+"""
+
+try:
+    from isal import igzip as gzip
+except ImportError:
+    import gzip
+
+# Favour speed when writing. The standard library compresses several times faster at 1
+# than at its default of 9, for a slightly larger file. ISA-L only has levels 0-3, where
+# 1 is a little faster than its default of 2.
+FAST_COMPRESSLEVEL = 1
@@ -22,13 +22,22 @@ import functools
 import time
 from datetime import datetime
 
-import h3
-
-import heapq
+import h3.api.numpy_int as h3i
+import numba
+import numpy as np
 import pandas as pd
 
+from fastgzip import gzip
+
 DATA_DIR = os.path.join(pathlib.Path(__file__).parent.absolute(), "data")
 
+# H3 indexes are stored as hex strings in CSVs but handled as integers in memory
+H3_CONVERTERS = {"hex": lambda h: int(h, 16)}
+
+# Hexagon costs are held as uint16 hundredths of a minute, so every hexagon takes
+# between 0.01 and 655.35 minutes to cross
+COST_SCALE = 100
+
 
 def timer(func):
     @functools.wraps(func)
@@ -53,21 +62,140 @@ def get_travel_time_hexes_from_csv(file_path="friction_surface.gz"):
         file_path (str): H3 friction surface file name. File expected to be in ``DATA_DIR``
 
     Returns:
-        dict: ``{h3_id: {"cost": 10}}``
+        pd.DataFrame: ``hex`` (integer H3 index) and ``value`` (float32 cost) columns
     """
     file_path = os.path.join(DATA_DIR, file_path)
-    return pd.read_csv(file_path, index_col="hex").to_dict("index")
+    read_options = dict(
+        usecols=["hex", "value"], dtype={"value": "float32"}, converters=H3_CONVERTERS
+    )
+    if file_path.endswith(".gz"):
+        with gzip.open(file_path, "rb") as f:
+            return pd.read_csv(f, **read_options)
+    # pandas infers any other compression from the extension
+    return pd.read_csv(file_path, **read_options)
+
+
+def convert_friction_to_feather(
+    csv_path="friction_surface.gz", feather_path="friction_surface.fhr"
+):
+    """Convert the H3 friction surface CSV to Feather, which loads many times faster
+
+    Args:
+        csv_path (str): H3 friction surface CSV file name. File expected to be in ``DATA_DIR``
+        feather_path (str): Feather file name to write to ``DATA_DIR``
+    """
+    df = get_travel_time_hexes_from_csv(csv_path)
+    df["hex"] = df["hex"].astype("uint64")
+    df["value"] = quantize_costs(df["value"])
+    feather_path = os.path.join(DATA_DIR, feather_path)
+    df.to_feather(feather_path, compression="zstd")
+    print(f"Results written to {feather_path}")
+
+
+def quantize_costs(minutes):
+    """Convert hexagon costs in minutes to the integer units used by :class:`~H3CostGraph`
+
+    Missing costs default to 20 minutes.
+
+    Args:
+        minutes (pd.Series): Cost of traversing each hexagon in minutes
+
+    Returns:
+        np.ndarray: uint16 costs in ``1 / COST_SCALE`` minutes
+    """
+    scaled = np.rint(minutes.fillna(20).to_numpy(dtype=np.float64) * COST_SCALE)
+    return scaled.clip(1, np.iinfo(np.uint16).max).astype(np.uint16)
+
+
+def get_travel_time_hexes(file_path="friction_surface.fhr", csv_path="friction_surface.gz"):
+    """Load the Feather copy of the H3 friction surface
+
+    The Feather file is created from the CSV with :func:`~convert_friction_to_feather`
+    the first time it is needed, and again whenever the CSV is newer than it.
+
+    Args:
+        file_path (str): H3 friction surface Feather file name. File expected to be in ``DATA_DIR``
+        csv_path (str): H3 friction surface CSV file name. File expected to be in ``DATA_DIR``
+
+    Returns:
+        pd.DataFrame: ``hex`` (integer H3 index) and ``value`` (uint16 cost, see
+        :func:`~quantize_costs`) columns
+    """
+    feather_path = os.path.join(DATA_DIR, file_path)
+    source_path = os.path.join(DATA_DIR, csv_path)
+    if not os.path.exists(feather_path) or (
+        os.path.exists(source_path)
+        and os.path.getmtime(source_path) > os.path.getmtime(feather_path)
+    ):
+        convert_friction_to_feather(csv_path, file_path)
+    return pd.read_feather(feather_path, columns=["hex", "value"])
 
 
 class H3CostGraph:
-    """Graph data structure for traversing hexagons"""
+    """Graph data structure for traversing hexagons
 
-    def __init__(self):
+    Hexagons on the friction surface are numbered in the order they appear in
+    the friction surface file. ``self.hexes`` maps that compact index to an H3 index
+    and ``self.idx`` is the reverse. ``self.cost_arr`` holds the cost of traversing
+    each hexagon in the units of :func:`~quantize_costs`.
+
+    Edges are stored in compressed sparse row (CSR) form: the neighbours of hexagon
+    ``i`` are ``self.indices[self.indptr[i]:self.indptr[i + 1]]``, and ``self.weights``
+    holds the cost of each of those edges. H3 adjacency is symmetric, so
+    ``self.reverse_weights`` holds the cost of each edge travelled the other way.
+    Neighbours that fall outside the friction surface are dropped, so searches stay
+    on it. ``self.min_weight`` and ``self.max_weight`` bound every edge's cost.
+
+    Args:
+        costs (pd.DataFrame): ``hex`` and ``value`` columns as from
+            :func:`~get_travel_time_hexes`, which is read when not given"""
+
+    def __init__(self, costs=None):
         self.edges = {}
-        self.costs = get_travel_time_hexes_from_csv()
+        if costs is None:
+            costs = get_travel_time_hexes()
+        self.hexes = costs["hex"].to_numpy(dtype=np.uint64)
+        self.idx = {h: i for i, h in enumerate(costs["hex"].tolist())}
+        if costs["value"].dtype == np.uint16:
+            self.cost_arr = costs["value"].to_numpy()
+        else:
+            self.cost_arr = quantize_costs(costs["value"])
+        # Edge weights are drawn from the hexagon costs, so these bound them in either direction
+        self.min_weight = int(self.cost_arr.min())
+        self.max_weight = int(self.cost_arr.max())
+        if self.min_weight <= 0:
+            raise ValueError("Hexagon costs must be positive")
+
+        nbrs = self._build_neighbours()
+        valid = nbrs >= 0
+        degree = valid.sum(axis=1)
+        self.indptr = np.zeros(len(nbrs) + 1, dtype=np.int64)
+        np.cumsum(degree, out=self.indptr[1:])
+        self.indices = nbrs[valid].astype(np.int32)
+        # Leaving a hexagon costs the same whichever neighbour is next
+        self.weights = np.repeat(self.cost_arr, degree)
+        self.reverse_weights = self.cost_arr[self.indices]
+
+    def _build_neighbours(self):
+        """Look up every hexagon's ring once and translate it to compact indices
+
+        Returns:
+            np.ndarray: ``(n, 6)`` compact neighbour indices, padded with -1"""
+        rings = np.zeros((len(self.hexes), 7), dtype=np.uint64)
+        for i, h in enumerate(self.hexes.tolist()):
+            ring = h3i.hex_range(h, 1)
+            rings[i, : len(ring)] = ring
+
+        order = np.argsort(self.hexes)
+        pos = order[np.searchsorted(self.hexes, rings, sorter=order).clip(max=len(order) - 1)]
+        nbrs = np.where(self.hexes[pos] == rings, pos, -1)
+        nbrs[nbrs == np.arange(len(nbrs))[:, None]] = -1
+        # Sort the -1 padding (and the hexagon itself) to the end of each row
+        return -np.sort(-nbrs, axis=1)[:, :6]
 
     def neighbors(self, h):
-        return h3.hex_range(h, 1)
+        i = self.idx[h]
+        return self.hexes[self.indices[self.indptr[i] : self.indptr[i + 1]]].tolist()
 
     def cost(self, current, next):
         """The default time to traverse a hexagon is 20 minutes. Beware.
@@ -75,23 +203,294 @@ class H3CostGraph:
         Future implementations of this can be directioned and include the
         "next" hexagon by calculating costs for each edge of a hexagon, rather
         than assuming uniform travel across it"""
-        return self.costs.get(current, {}).get("value", 20)
+        i = self.idx.get(current)
+        return 20 if i is None else self.cost_arr[i] / COST_SCALE
+
+
+@numba.njit(cache=True)
+def _new_queue(width, max_weight, capacity):
+    """Create an empty bucket queue for searching a graph with the given edge weights
+
+    Buckets are ``width`` wide, which must be no more than the cheapest edge. Expanding
+    a hexagon can then only ever push into a later bucket, so hexagons within a bucket
+    can be settled in any order and each push and pop is constant time. Pushed keys
+    never run further ahead than the dearest edge, so a ring of buckets spanning that
+    range is reused as the search advances. Each bucket is a linked list of entries.
+
+    Args:
+        width (float): Bucket width, at most the smallest edge weight
+        max_weight (float): Largest edge weight
+        capacity (int): Maximum number of pushes
+
+    Returns:
+        tuple: bucket heads, entry items, entry links and a ``[bucket, entries, pending]``
+        state array, to pass to :func:`~_push` and :func:`~_pop`
+    """
+    n_buckets = int(max_weight / width) + 2
+    state = np.zeros(3, dtype=np.int64)
+    return (
+        np.full(n_buckets, -1, dtype=np.int64),
+        np.empty(capacity, dtype=np.int64),
+        np.empty(capacity, dtype=np.int64),
+        state,
+    )
+
+
+@numba.njit(cache=True)
+def _push(queue, width, item, priority):
+    """Add ``item`` to a bucket queue from :func:`~_new_queue`"""
+    head, items, links, state = queue
+    slot = int(priority / width) % head.shape[0]
+    entry = state[1]
+    items[entry] = item
+    links[entry] = head[slot]
+    head[slot] = entry
+    state[1] += 1
+    state[2] += 1
+
+
+@numba.njit(cache=True)
+def _lowest_bucket(queue):
+    """Advance to the first non-empty bucket of a non-empty queue and return its number
+
+    Every queued priority is at least the bucket number times the bucket width."""
+    head, items, links, state = queue
+    while head[state[0] % head.shape[0]] < 0:
+        state[0] += 1
+    return state[0]
+
+
+@numba.njit(cache=True)
+def _pop(queue):
+    """Remove and return an item from the lowest bucket of a non-empty queue"""
+    head, items, links, state = queue
+    slot = _lowest_bucket(queue) % head.shape[0]
+    entry = head[slot]
+    head[slot] = links[entry]
+    state[2] -= 1
+    return items[entry]
+
+
+@numba.njit(cache=True)
+def dijkstra_csr(
+    indptr, indices, weights, min_weight, max_weight, start, hex_goal=None, distance_goal=None
+):
+    """Compiled Dijkstra search over a graph in compressed sparse row form
+
+    The frontier is a bucket queue, see :func:`~_new_queue`. Improved hexagons are
+    pushed again rather than decreased in place. Once a hexagon is popped it is marked
+    visited, which both skips its stale entries on later pops and stops it from being
+    relaxed again by its neighbours.
+
+    Numba compiles a separate version for each combination of goals passed, and prunes
+    the checks for a goal left as ``None`` from that version. See :func:`~dijkstra_to_hex`
+    and :func:`~dijkstra_isochrone`.
+
+    Args:
+        indptr (np.ndarray): Offsets of each hexagon's edges, see :class:`~H3CostGraph`
+        indices (np.ndarray): Compact index of the hexagon at the end of each edge
+        weights (np.ndarray): Cost of each edge, all positive
+        min_weight (int): Lower bound on the edge costs, greater than zero
+        max_weight (int): Upper bound on the edge costs
+        start (int): Compact index of the origin
+        hex_goal (int): Compact index of the destination, or None
+        distance_goal (float): Cost at which to stop expanding, or None
+
+    Returns:
+        tuple: came_from (np.ndarray), cost_so_far (np.ndarray)
+
+        ``came_from`` holds each hexagon's predecessor, -1 for the origin and unreached hexes
+        ``cost_so_far`` holds each hexagon's cumulative cost, ``np.inf`` when unreached
+    """
+    n = indptr.shape[0] - 1
+    came_from = np.full(n, -1, dtype=np.int32)
+    cost_so_far = np.full(n, np.inf)
+    visited = np.zeros(n, dtype=np.bool_)
+    # Every push follows a strict improvement along an edge, so edges bound the pushes
+    width = min_weight
+    frontier = _new_queue(width, max_weight, indices.size + 1)
+
+    cost_so_far[start] = 0
+    _push(frontier, width, start, 0)
+
+    while frontier[3][2] > 0:
+        current = _pop(frontier)
+        if visited[current]:
+            continue
+        visited[current] = True
+
+        if hex_goal is not None:
+            if current == hex_goal:
+                break
+
+        for edge in range(indptr[current], indptr[current + 1]):
+            next = indices[edge]
+            if visited[next]:
+                continue
+            new_cost = cost_so_far[current] + weights[edge]
+            if new_cost < cost_so_far[next]:
+                cost_so_far[next] = new_cost
+                came_from[next] = current
+                if distance_goal is not None:
+                    if new_cost >= distance_goal:
+                        continue
+                _push(frontier, width, next, new_cost)
+
+    return came_from, cost_so_far
+
+
+@numba.njit(cache=True)
+def bidirectional_dijkstra_csr(
+    indptr, indices, weights, reverse_weights, min_weight, max_weight, start, hex_goal
+):
+    """Compiled bidirectional Dijkstra search over a graph in compressed sparse row form
+
+    A forward search from ``start`` and a backward search from ``hex_goal`` take turns
+    expanding whichever frontier is nearer. Every time a hexagon gains a label from both
+    searches the combined cost is a candidate path, and the searches stop once their
+    frontiers together can't beat the best candidate. The backward half of the best
+    path is then stitched onto the forward search's results.
+
+    The backward search walks the same edges, so the graph's adjacency must be
+    symmetric, as it is for H3.
+
+    Args:
+        indptr (np.ndarray): Offsets of each hexagon's edges, see :class:`~H3CostGraph`
+        indices (np.ndarray): Compact index of the hexagon at the end of each edge
+        weights (np.ndarray): Cost of each edge, all positive
+        reverse_weights (np.ndarray): Cost of each edge travelled from its end to its start
+        min_weight (int): Lower bound on the edge costs either way, greater than zero
+        max_weight (int): Upper bound on the edge costs either way
+        start (int): Compact index of the origin
+        hex_goal (int): Compact index of the destination
+
+    Returns:
+        tuple: came_from (np.ndarray), cost_so_far (np.ndarray)
+
+        As for :func:`~dijkstra_csr`, covering the forward search and the least cost
+        path. ``hex_goal`` is unreached when there is no path to it.
+    """
+    n = indptr.shape[0] - 1
+    came_from = np.full(n, -1, dtype=np.int32)
+    cost_so_far = np.full(n, np.inf)
+    visited = np.zeros(n, dtype=np.bool_)
+    goes_to = np.full(n, -1, dtype=np.int32)
+    cost_to_goal = np.full(n, np.inf)
+    visited_from_goal = np.zeros(n, dtype=np.bool_)
+    width = min_weight
+    frontier = _new_queue(width, max_weight, indices.size + 1)
+    goal_frontier = _new_queue(width, max_weight, indices.size + 1)
+
+    cost_so_far[start] = 0
+    _push(frontier, width, start, 0)
+    cost_to_goal[hex_goal] = 0
+    _push(goal_frontier, width, hex_goal, 0)
+    best_cost = 0.0 if start == hex_goal else np.inf
+    meeting = start if start == hex_goal else -1
+
+    while frontier[3][2] > 0 and goal_frontier[3][2] > 0:
+        bucket = _lowest_bucket(frontier)
+        goal_bucket = _lowest_bucket(goal_frontier)
+        if (bucket + goal_bucket) * width >= best_cost:
+            break
+
+        if bucket <= goal_bucket:
+            current = _pop(frontier)
+            if visited[current]:
+                continue
+            visited[current] = True
+            for edge in range(indptr[current], indptr[current + 1]):
+                next = indices[edge]
+                if visited[next]:
+                    continue
+                new_cost = cost_so_far[current] + weights[edge]
+                if new_cost < cost_so_far[next]:
+                    cost_so_far[next] = new_cost
+                    came_from[next] = current
+                    _push(frontier, width, next, new_cost)
+                    if new_cost + cost_to_goal[next] < best_cost:
+                        best_cost = new_cost + cost_to_goal[next]
+                        meeting = next
+        else:
+            current = _pop(goal_frontier)
+            if visited_from_goal[current]:
+                continue
+            visited_from_goal[current] = True
+            for edge in range(indptr[current], indptr[current + 1]):
+                next = indices[edge]
+                if visited_from_goal[next]:
+                    continue
+                new_cost = cost_to_goal[current] + reverse_weights[edge]
+                if new_cost < cost_to_goal[next]:
+                    cost_to_goal[next] = new_cost
+                    goes_to[next] = current
+                    _push(goal_frontier, width, next, new_cost)
+                    if cost_so_far[next] + new_cost < best_cost:
+                        best_cost = cost_so_far[next] + new_cost
+                        meeting = next
+
+    if meeting >= 0:
+        current = meeting
+        while current != hex_goal:
+            next = goes_to[current]
+            for edge in range(indptr[current], indptr[current + 1]):
+                if indices[edge] == next:
+                    cost_so_far[next] = cost_so_far[current] + weights[edge]
+            came_from[next] = current
+            current = next
+
+    return came_from, cost_so_far
+
+
+def _compact_results(came_from_arr, cost_so_far_arr):
+    """Keep only the hexagons a compiled search reached
+
+    Returns:
+        tuple: compact indices of the reached hexagons (int32), their predecessors (int32)
+        and their cumulative costs (uint32, in the units of :func:`~quantize_costs`)
+    """
+    reached = np.flatnonzero(np.isfinite(cost_so_far_arr)).astype(np.int32)
+    return reached, came_from_arr[reached], cost_so_far_arr[reached].astype(np.uint32)
+
 
+def _goal_cost(results, goal, default):
+    """Cost in minutes of compact index ``goal`` in :func:`~_compact_results` output
 
-class PriorityQueue:
-    """Priority queue data structure for search algorithms"""
+    ``reached`` is sorted, so the goal is found by binary search. ``default`` is returned
+    when the goal wasn't reached."""
+    reached, _, cost_arr = results
+    pos = np.searchsorted(reached, goal)
+    if pos < reached.size and reached[pos] == goal:
+        return float(cost_arr[pos]) / COST_SCALE
+    return default
 
-    def __init__(self):
-        self.elements = []
 
-    def empty(self) -> bool:
-        return not self.elements
+def _start_only(graph, start):
+    """:func:`~_compact_results` output for a search that reached only ``start``"""
+    return (
+        np.array([graph.idx[start]], dtype=np.int32),
+        np.array([-1], dtype=np.int32),
+        np.zeros(1, dtype=np.uint32),
+    )
 
-    def put(self, item, priority: float):
-        heapq.heappush(self.elements, (priority, item))
 
-    def get(self):
-        return heapq.heappop(self.elements)[1]
+def _search_results(graph, start, results):
+    """Convert :func:`~_compact_results` output to ``came_from`` and ``cost_so_far`` dicts"""
+    reached, came_from_arr, cost_arr = results
+    hexes = graph.hexes[reached].tolist()
+    came_from = dict(zip(hexes, graph.hexes[came_from_arr].tolist()))
+    came_from[start] = None
+    cost_so_far = dict(zip(hexes, (cost_arr / COST_SCALE).tolist()))
+    return came_from, cost_so_far
+
+
+def _check_start(graph, start):
+    """Raise a ValueError unless ``start`` is a hexagon on the friction surface"""
+    if start not in graph.idx:
+        raise ValueError(
+            f"Start hexagon {start:x} (resolution {h3i.h3_get_resolution(start)}) "
+            "is not on the friction surface"
+        )
 
 
 # @timer
@@ -103,47 +502,133 @@ def dijkstra_search(graph, start, hex_goal=None, distance_goal=None):
     the goal. A ``distance_goal`` will calculate an isochrone of hexes up to the goal
     originating from the start location.
 
+    The search itself runs in :func:`~dijkstra_csr` and is confined to hexagons
+    covered by the friction surface. Searches with only one goal run a version of it
+    compiled for that goal alone.
+
     Heavy inspiration from: https://www.redblobgames.com/pathfinding/a-star/implementation.html#python-dijkstra
 
     Args:
         graph (H3CostGraph): an H3CostGraph object containing travel times
-        start (tuple): Lat/lon pair of driving origin
-        hex_goal (tuple): Lat/lon pair of driving destination
+        start (int): H3 index of driving origin
+        hex_goal (int): H3 index of driving destination
         distance_goal (int): Maximum number of minutes that when reached, will exit search
 
     Returns:
         tuple: came_from (dict), cost_so_far (dict)
 
+        With a ``distance_goal`` only hexagons at most that many minutes away are kept.
         ``came_from`` is a dict of ``{hex: next_hex}``
         ``cost_so_far`` is a dict of ``{hex: cumulative_cost_so_far}``
 
+    Raises:
+        ValueError: If there's no goal, or ``start`` isn't on the friction surface
+
     """
 
-    assert hex_goal or distance_goal, "There must be a goal for the search algorithm"
-    frontier = PriorityQueue()
-    frontier.put(start, 0)
-    came_from = {}
-    cost_so_far = {}
-    came_from[start] = None
-    cost_so_far[start] = 0
+    return _search_results(graph, start, _dijkstra_arrays(graph, start, hex_goal, distance_goal))
+
+
+def _dijkstra_arrays(graph, start, hex_goal, distance_goal):
+    """Run :func:`~dijkstra_csr` for :func:`~dijkstra_search`, returning compact arrays"""
+    if hex_goal is None and distance_goal is None:
+        raise ValueError("There must be a goal for the search algorithm")
+    _check_start(graph, start)
+    if hex_goal is not None and hex_goal not in graph.idx:
+        # The goal can never be reached, so don't settle the whole surface looking for it
+        if distance_goal is None:
+            return _start_only(graph, start)
+        hex_goal = None
+    # The kernel works in the graph's integer cost units, which float64 sums exactly
+    results = _compact_results(
+        *dijkstra_csr(
+            graph.indptr,
+            graph.indices,
+            graph.weights,
+            graph.min_weight,
+            graph.max_weight,
+            graph.idx[start],
+            None if hex_goal is None else graph.idx[hex_goal],
+            None if distance_goal is None else float(distance_goal) * COST_SCALE,
+        )
+    )
+    if distance_goal is not None:
+        # The kernel labels the ring of hexagons just past the limit before dropping them
+        within = results[2] / COST_SCALE <= distance_goal
+        results = tuple(arr[within] for arr in results)
+    return results
+
+
+def dijkstra_to_hex(graph, start, hex_goal):
+    """Least cost path search from ``start`` that stops once ``hex_goal`` is reached
 
-    while not frontier.empty():
-        current = frontier.get()
+    Args:
+        graph (H3CostGraph): an H3CostGraph object containing travel times
+        start (int): H3 index of driving origin
+        hex_goal (int): H3 index of driving destination
 
-        if hex_goal is not None and current == hex_goal:
-            break
+    Returns:
+        tuple: came_from (dict), cost_so_far (dict), see :func:`~dijkstra_search`
+    """
+    return dijkstra_search(graph, start, hex_goal=hex_goal)
 
-        for next in graph.neighbors(current):
-            new_cost = cost_so_far[current] + graph.cost(current, next)
-            if next not in cost_so_far or new_cost < cost_so_far[next]:
-                cost_so_far[next] = new_cost
-                came_from[next] = current
-                priority = new_cost
-                if distance_goal is not None and priority >= distance_goal:
-                    continue
-                frontier.put(next, priority)
 
-    return came_from, cost_so_far
+def dijkstra_isochrone(graph, start, max_cost):
+    """Isochrone search of every hexagon within ``max_cost`` minutes of ``start``
+
+    Args:
+        graph (H3CostGraph): an H3CostGraph object containing travel times
+        start (int): H3 index of driving origin
+        max_cost (int): Maximum number of minutes from ``start``, inclusive
+
+    Returns:
+        tuple: came_from (dict), cost_so_far (dict), see :func:`~dijkstra_search`
+    """
+    return dijkstra_search(graph, start, distance_goal=max_cost)
+
+
+def bidirectional_dijkstra(graph, start, hex_goal):
+    """Find the least cost path between two hexagons by searching from both ends at once
+
+    Meeting in the middle expands far fewer hexagons than :func:`~dijkstra_search` with a
+    ``hex_goal``. The search runs in :func:`~bidirectional_dijkstra_csr` and is confined
+    to hexagons covered by the friction surface.
+
+    Args:
+        graph (H3CostGraph): an H3CostGraph object containing travel times
+        start (int): H3 index of driving origin
+        hex_goal (int): H3 index of driving destination
+
+    Returns:
+        tuple: came_from (dict), cost_so_far (dict)
+
+        As for :func:`~dijkstra_search`, covering the hexagons reached from ``start`` and
+        the least cost path. ``hex_goal`` is missing when it can't be reached.
+
+    Raises:
+        ValueError: If ``start`` isn't on the friction surface
+    """
+    return _search_results(graph, start, _bidirectional_arrays(graph, start, hex_goal))
+
+
+def _bidirectional_arrays(graph, start, hex_goal):
+    """Run :func:`~bidirectional_dijkstra_csr` for :func:`~bidirectional_dijkstra`,
+    returning compact arrays"""
+    _check_start(graph, start)
+    if hex_goal not in graph.idx:
+        return _start_only(graph, start)
+    return _compact_results(
+        *bidirectional_dijkstra_csr(
+            graph.indptr,
+            graph.indices,
+            graph.weights,
+            graph.reverse_weights,
+            graph.min_weight,
+            graph.max_weight,
+            graph.idx[start],
+            graph.idx[hex_goal],
+        )
+    )
 
 
 @timer
@@ -153,8 +638,8 @@ def reconstruct_path(came_from, cost_so_far, start, goal):
     Args:
         came_from (dict): Result of :func:`~dijkstra_search` containing traversal paths
         cost_so_far (dict): Result of :func:`~dijkstra_search` containing traversal costs
-        start (str): H3 index of starting point
-        goal (str): H3 index of search goal
+        start (int): H3 index of starting point
+        goal (int): H3 index of search goal
 
     Returns:
         dict: Dictionary of hexagons with cost so far as value"""
@@ -169,74 +654,138 @@ def reconstruct_path(came_from, cost_so_far, start, goal):
     return path
 
 
-temp_df_cache = {}
-g = H3CostGraph()
+def _to_frame(costs, origin):
+    """Build a ``hex``/``cost``/``origin`` frame for writing from a ``{hex: cost}`` dict"""
+    return pd.DataFrame(
+        {
+            "hex": np.fromiter(costs.keys(), dtype=np.uint64, count=len(costs)),
+            "cost": np.fromiter(costs.values(), dtype=np.float32, count=len(costs)),
+            "origin": np.uint64(origin),
+        }
+    )
 
 
-def calculate_travel_time(
-    start, hex_goal, distance_goal=3000, hex_res=6, temp_df_cache=temp_df_cache
-):
-    """Calculate drive time and intervening population.
+def _results_frame(results, origin):
+    """Build a ``hex``/``cost``/``origin`` frame from :func:`~_compact_results` output"""
+    reached, _, cost_arr = results
+    return pd.DataFrame(
+        {
+            "hex": get_graph().hexes[reached],
+            "cost": (cost_arr / COST_SCALE).astype(np.float32),
+            "origin": np.uint64(origin),
+        }
+    )
 
-    This function is caches drive time isochrones in the
-    ``data`` folder, so the distance only needs to
-    be calculated once.
 
-    .. warning::
-        Increasing the distance_goal increases the run time exponentially
+@functools.lru_cache(maxsize=None)
+def get_graph():
+    """The module's :class:`~H3CostGraph`, built from the friction surface on first use"""
+    return H3CostGraph()
+
+
+@functools.lru_cache(maxsize=16)
+def _cached_search(start_hex, hex_goal, distance_goal):
+    """Memoized compact search results, see :func:`~cached_dijkstra_search`
+
+    Each entry holds 12 bytes per hexagon reached, so an isochrone covering a
+    continental res 7 surface of ~2M hexagons takes ~24 MB.
+    """
+    if hex_goal is None:
+        return _dijkstra_arrays(get_graph(), start_hex, None, distance_goal)
+    return _bidirectional_arrays(get_graph(), start_hex, hex_goal)
+
+
+def cached_dijkstra_search(start_hex, hex_goal=None, distance_goal=None):
+    """Memoized search over the module's graph
+
+    A ``hex_goal`` runs :func:`~bidirectional_dijkstra`, otherwise the isochrone up to
+    ``distance_goal`` is found with :func:`~dijkstra_isochrone`. Repeated searches are
+    answered from compact arrays kept in memory rather than searched again, and the
+    dicts are built from them on each call.
+
+    Args:
+        start_hex (int): H3 index of driving origin
+        hex_goal (int): H3 index of driving destination
+        distance_goal (int): Maximum number of minutes to search when there's no ``hex_goal``
+
+    Returns:
+        tuple: came_from (dict), cost_so_far (dict)
+    """
+    results = _cached_search(start_hex, hex_goal, distance_goal)
+    return _search_results(get_graph(), start_hex, results)
+
+
+def calculate_travel_time(start, hex_goal, distance_goal=3000, hex_res=6, persist=False):
+    """Calculate drive time and intervening population.
+
+    Searches are memoized by :func:`~cached_dijkstra_search`, so repeating an
+    origin/destination pair is cheap. With ``persist`` set, the hexagons searched
+    and least cost path are also written to the ``data`` folder.
+    For drive time isochrones see :func:`~calculate_isochrone`.
 
     Args:
         start (tuple): Lat/lon pair of driving origin
         hex_goal (tuple): Lat/lon pair of driving destination
         distance_goal (int): Distance in minutes from start to calculate drive time
-        hex_res (int): H3 resolution
+        hex_res (int): H3 resolution, which must match the friction surface's. Surfaces
+            from :func:`~h3raster.RasterH3Converter.create_h3_from_raster` default to 7
+        persist (bool): Write the isochrone and least cost path to ``DATA_DIR``
 
     Returns:
-        tuple: population (int), distance in minutes (float)
+        float: distance in minutes, or ``distance_goal`` if the destination wasn't reached
     """
 
-    start_hex = h3.geo_to_h3(start[0], start[1], hex_res)
-    hex_goal = h3.geo_to_h3(hex_goal[0], hex_goal[1], hex_res)
-    iso_path = os.path.join(DATA_DIR, f"hex_isochrone_{start_hex}.gz")
-    lcp_path = os.path.join(DATA_DIR, f"hex_path_{start_hex}.gz")
+    start_hex = h3i.geo_to_h3(start[0], start[1], hex_res)
+    hex_goal = h3i.geo_to_h3(hex_goal[0], hex_goal[1], hex_res)
+    iso_path = os.path.join(DATA_DIR, f"hex_isochrone_{start_hex:x}.fhr")
+    lcp_path = os.path.join(DATA_DIR, f"hex_path_{start_hex:x}.fhr")
     s = datetime.utcnow()
     # TODO accommodate both hex and distance goals
-    came_from, cost_so_far = dijkstra_search(g, start_hex, hex_goal=hex_goal)
-    
+    results = _cached_search(start_hex, hex_goal, None)
+
     print(f"Search took {(datetime.utcnow() - s).total_seconds()} seconds")
 
-    df = pd.DataFrame.from_dict(data=cost_so_far, orient="index").reset_index()
-    df.columns = ["hex", "cost"]
-    df = df[["hex", "cost"]]
-    df["origin"] = start_hex
-    df.to_csv(iso_path, header=True, index=False, compression="gzip")
-    temp_df_cache.clear()
-    temp_df_cache[iso_path] = df
-    
-    path = reconstruct_path(came_from, cost_so_far, start_hex, hex_goal)
-    path_df = pd.DataFrame.from_dict(data=path, orient="index").reset_index()
-    path_df.columns = ["hex", "cost"]
-    path_df = path_df[["hex", "cost"]]
-    path_df["origin"] = start_hex
-    path_df.to_csv(lcp_path, header=True, index=False, compression="gzip")
-    
+    if persist:
+        _results_frame(results, start_hex).to_feather(iso_path, compression="lz4")
 
-    # Optimization to avoid repeatedly opening (and unzipping) raster from disk
-    #   If your input Origins are sorted, this will considerably speed up your searches
-    if temp_df_cache.get(iso_path) is not None:
-        iso_df = temp_df_cache.get(iso_path)
-    else:
-        iso_df = pd.read_csv(iso_path)
-        temp_df_cache.clear()
-        temp_df_cache[iso_path] = iso_df
+        came_from, cost_so_far = _search_results(get_graph(), start_hex, results)
+        if hex_goal in came_from:
+            path = reconstruct_path(came_from, cost_so_far, start_hex, hex_goal)
+            _to_frame(path, start_hex).to_feather(lcp_path, compression="lz4")
 
-    try:
-        cost_to_dest = list(iso_df[iso_df["hex"] == hex_goal]["cost"])[0]
+    return _goal_cost(results, get_graph().idx.get(hex_goal, -1), distance_goal)
 
-    except IndexError:
-        cost_to_dest = distance_goal
 
-    return cost_to_dest
+def calculate_isochrone(start, distance_goal, hex_res=6, persist=False):
+    """Calculate the drive time isochrone around a starting point
+
+    Searches are memoized by :func:`~cached_dijkstra_search`, so repeating an
+    origin/distance pair is cheap.
+
+    .. warning::
+        Increasing the distance_goal increases the run time exponentially
+
+    Args:
+        start (tuple): Lat/lon pair of driving origin
+        distance_goal (int): Drive time in minutes the isochrone extends to, inclusive
+        hex_res (int): H3 resolution, which must match the friction surface's. Surfaces
+            from :func:`~h3raster.RasterH3Converter.create_h3_from_raster` default to 7
+        persist (bool): Write the isochrone to ``DATA_DIR``
+
+    Returns:
+        pd.DataFrame: ``hex``, ``cost`` (minutes from ``start``) and ``origin`` columns
+    """
+    start_hex = h3i.geo_to_h3(start[0], start[1], hex_res)
+    s = datetime.utcnow()
+    results = _cached_search(start_hex, None, distance_goal)
+
+    print(f"Search took {(datetime.utcnow() - s).total_seconds()} seconds")
+
+    df = _results_frame(results, start_hex)
+    if persist:
+        iso_path = os.path.join(DATA_DIR, f"hex_isochrone_{start_hex:x}.fhr")
+        df.to_feather(iso_path, compression="lz4")
+    return df
 
 
 if __name__ == "__main__":
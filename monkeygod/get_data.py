@@ -4,6 +4,8 @@ import requests
 
 FRICTION_SURFACE_URL = "https://malariaatlas.org/geoserver/ows?service=CSW&version=2.0.1&request=DirectDownload&ResourceId=Explorer:2015_friction_surface_v1_Decompressed"
 ZIP_FILE_NAME = "friction_surface.zip"
+# Read and write the download in 1 MB pieces rather than many tiny ones
+CHUNK_SIZE = 1024 * 1024
 
 
 def _friction_surface_exists(file_name=ZIP_FILE_NAME):
@@ -22,14 +24,16 @@ def get_friction_surface(url=FRICTION_SURFACE_URL, download_location=ZIP_FILE_NA
         return
     print("Downloading friction surface")
     with requests.get(url, stream=True) as r:
-        with open(download_location, "wb") as f:
+        with open(download_location, "wb", buffering=CHUNK_SIZE) as f:
             total_downloaded = 0
-            for data in r.iter_content(chunk_size=4096):
+            next_report = 10
+            for data in r.iter_content(chunk_size=CHUNK_SIZE):
                 total_downloaded += len(data)
                 pretty_downloaded = total_downloaded / 1024 / 1024
                 f.write(data)
-                if pretty_downloaded % 10 == 0:
-                    print(f"Downloaded {pretty_downloaded} MB of approx 710 MB")
+                if pretty_downloaded >= next_report:
+                    print(f"Downloaded {pretty_downloaded:.0f} MB of approx 710 MB")
+                    next_report += 10
     print("Success")
 
 
@@ -1,19 +1,113 @@
 import os
 import pathlib
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
 from math import floor, ceil
 import h3
+import h3.api.numpy_int as h3i
+import numpy as np
 import rasterio
+from rasterio import windows
 from rasterio.windows import Window
 from pyproj import Proj
 import pandas as pd
 from zipfile import ZipFile
-from collections import namedtuple
 import ntpath
 
+from fastgzip import FAST_COMPRESSLEVEL, gzip
+
 DATA_DIR = os.path.join(pathlib.Path(__file__).parent.absolute(), "data")
 
 
-HexStore = namedtuple("HexStore", "value count")
+# Resampling methods accepted by create_h3_from_raster, mapped to the ufunc that
+# combines values sharing a hex. "avg" is summed and divided by count at the end.
+AGGREGATION_METHODS = {"sum": np.add, "avg": np.add, "max": np.maximum, "min": np.minimum}
+
+# Rough number of raster cells resampled by each worker task, and between progress reports
+TILE_CELLS = 1000000
+PROGRESS_CELLS = 100000
+
+
+def _tile_windows(window, block_shape, width, height, tile_cells=TILE_CELLS):
+    """Split a window into tiles made of whole raster blocks
+
+    Consecutive blocks are grouped, first across and then down, until a tile holds roughly
+    ``tile_cells`` cells, so a striped raster's 1 row blocks don't each become a task.
+
+    Args:
+        window (rasterio.windows.Window): Window to split
+        block_shape (tuple): (rows, cols) of the raster's blocks
+        width (int): Raster width, in cells
+        height (int): Raster height, in cells
+        tile_cells (int): Approximate number of cells per tile
+
+    Returns:
+        list: rasterio.windows.Window tiles covering the part of ``window`` on the raster,
+        in row-major order"""
+    raster = Window(0, 0, width, height)
+    if not windows.intersect(window, raster):
+        return []
+    window = window.intersection(raster)
+    block_rows, block_cols = block_shape
+    row_stop, col_stop = window.row_off + window.height, window.col_off + window.width
+    # Start from the block holding the window's top left cell so tiles stay block aligned
+    row_start = window.row_off // block_rows * block_rows
+    col_start = window.col_off // block_cols * block_cols
+
+    blocks_across = ceil((col_stop - col_start) / block_cols)
+    tile_cols = block_cols * max(1, min(blocks_across, tile_cells // (block_rows * block_cols)))
+    tile_rows = block_rows * max(1, tile_cells // (block_rows * tile_cols))
+    return [
+        Window(col, row, tile_cols, tile_rows).intersection(window)
+        for row in range(row_start, row_stop, tile_rows)
+        for col in range(col_start, col_stop, tile_cols)
+    ]
+
+
+def _reduce_by_hex(hexes, values, counts, ufunc):
+    """Combine the values and counts of cells that share an H3 index
+
+    Args:
+        hexes (np.ndarray): Integer H3 index of each cell
+        values (np.ndarray): Value of each cell
+        counts (np.ndarray): Number of raster cells behind each value
+        ufunc (np.ufunc): Function combining values, from ``AGGREGATION_METHODS``
+
+    Returns:
+        tuple: Unique H3 indexes, their combined values and summed counts"""
+    order = np.argsort(hexes, kind="stable")
+    hexes = hexes[order]
+    starts = np.flatnonzero(np.r_[True, hexes[1:] != hexes[:-1]])
+    return (
+        hexes[starts],
+        ufunc.reduceat(values[order], starts),
+        np.add.reduceat(counts[order], starts),
+    )
+
+
+def _aggregate_tile(data, transform, row_off, col_off, h3_res, method):
+    """Resample one tile of raster cells into partial H3 values
+
+    Args:
+        data (np.ndarray): Raster values of the tile
+        transform (affine.Affine): Transform of the whole raster, without rotation
+        row_off (int): Row of the tile's top left cell in the raster
+        col_off (int): Column of the tile's top left cell in the raster
+        h3_res (int): H3 resolution to use
+        method (str): Resampling method, one of ``AGGREGATION_METHODS``
+
+    Returns:
+        tuple: Unique H3 indexes, partial values and counts, to combine across tiles"""
+    # Without rotation, longitude depends only on the column and latitude only on the row
+    lons = transform.c + (np.arange(col_off, col_off + data.shape[1]) + 0.5) * transform.a
+    lats = transform.f + (np.arange(row_off, row_off + data.shape[0]) + 0.5) * transform.e
+    hex_ids = np.frompyfunc(h3i.geo_to_h3, 3, 1)(lats[:, None], lons, h3_res).astype(np.uint64)
+
+    values = data.ravel().astype(np.float64)
+    if method == "avg":
+        values[values < 0.000000000001] = 0
+    return _reduce_by_hex(
+        hex_ids.ravel(), values, np.ones(values.size, dtype=np.int64), AGGREGATION_METHODS[method]
+    )
 
 
 class RasterH3Converter:
@@ -75,6 +169,7 @@ class RasterH3Converter:
         conversion_func=None,
         h3_res=7,
         break_val=None,
+        max_workers=None,
     ):
         """Create a CSV of H3 IDs with friction values from the friction raster
 
@@ -97,59 +192,76 @@ class RasterH3Converter:
             h3_res (int): H3 resolution to use
             break_val (int): Approximate number of cells to process. Generally
                                 used for testing to exit early when processing a large study area.
+            max_workers (int): Number of processes resampling tiles, defaults to the CPU count
 
         Returns:
-            None: Writes a CSV to the DATA_DIR, matching `in_file` file name."""
+            None: Writes a CSV to the DATA_DIR, matching `in_file` file name.
 
-        hexes = {}
-        cnt = 0
+        Raises:
+            ValueError: If the raster's transform is rotated"""
+
+        if method not in AGGREGATION_METHODS:
+            raise NotImplementedError("Unknown method")
 
         input_file_name = ntpath.split(in_file)[-1]
         output_file_name = input_file_name.split(".")[0] + ".gz"
         output_file_path = os.path.join(DATA_DIR, output_file_name)
         src = rasterio.open(in_file)
-        window = None
+        if src.transform.b != 0 or src.transform.d != 0:
+            raise ValueError(f"Rotated rasters are not supported: {in_file}")
+        window = Window(0, 0, src.width, src.height)
         if top_left and bottom_right:
             window = self.lat_lon_to_window(top_left, bottom_right, src)
-        for x, row in enumerate(src.read(1, window=window)):
-            for y, new_val in enumerate(row):
-                lon, lat = src.xy(x + window.row_off, y + window.col_off)
-                h = h3.geo_to_h3(lat, lon, h3_res)
-                existing_val = hexes.get(h)
-                if existing_val is None:
-                    existing_val = HexStore(None, 0)
-                if method == "max":
-                    if existing_val.value is None or existing_val.value < new_val:
-                        hexes[h] = HexStore(new_val, 1)
-                elif method == "min":
-                    if existing_val.value is None or existing_val.value > new_val:
-                        hexes[h] = HexStore(new_val, 1)
-                elif method == "avg":
-                    if existing_val.value is None or new_val < 0.000000000001:
-                        new_val = 0
-                    if existing_val.value is None or existing_val.count == 0:
-                        hexes[h] = HexStore(new_val, 1)
-                    else:
-                        new_val = ((existing_val.value * existing_val.count) + new_val) / (
-                            existing_val.count + 1
-                        )
-                        hexes[h] = HexStore(new_val, existing_val.count + 1)
-                elif method == "sum":
-                    val = existing_val.value or 0
-                    hexes[h] = (val + new_val, existing_val.count + 1)
-                else:
-                    raise NotImplementedError("Unknown method")
-
-                if cnt % 100000 == 0:
-                    print(f"Processed {cnt} rows")
-                cnt += 1
-            if break_val and cnt > break_val:
-                break
-
-        df = pd.DataFrame.from_dict(data=hexes, orient="index").reset_index()
-        df.columns = ["hex", "value", "count"]
-        df["value"] = df["value"].apply(conversion_func)
-        df[["hex", "value"]].to_csv(output_file_path, header=True, index=False, compression="gzip")
+
+        # Read the raster a few blocks at a time and resample them in worker processes.
+        #   Only a couple of tiles per worker are held in memory at once.
+        max_workers = max_workers or os.cpu_count()
+        tiles = []
+        pending = set()
+        cnt = 0
+        next_report = PROGRESS_CELLS
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            for tile in _tile_windows(
+                window, src.block_shapes[0], src.width, src.height, TILE_CELLS
+            ):
+                if len(pending) >= 2 * max_workers:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    tiles.extend(future.result() for future in done)
+                data = src.read(1, window=tile)
+                pending.add(
+                    executor.submit(
+                        _aggregate_tile,
+                        data,
+                        src.transform,
+                        tile.row_off,
+                        tile.col_off,
+                        h3_res,
+                        method,
+                    )
+                )
+                cnt += data.size
+                if cnt >= next_report:
+                    print(f"Processed {cnt} cells")
+                    next_report = (cnt // PROGRESS_CELLS + 1) * PROGRESS_CELLS
+                if break_val and cnt > break_val:
+                    break
+            tiles.extend(future.result() for future in pending)
+
+        if tiles:
+            hexes, values, counts = _reduce_by_hex(
+                *(np.concatenate(arrays) for arrays in zip(*tiles)), AGGREGATION_METHODS[method]
+            )
+        else:
+            # The window missed the raster, so write a CSV with no hexagons
+            hexes, values, counts = np.empty(0, dtype=np.uint64), np.empty(0), np.empty(0)
+        if method == "avg":
+            values /= counts
+        df = pd.DataFrame({"hex": hexes, "value": values})
+        df["hex"] = df["hex"].map(h3.h3_to_string)
+        if conversion_func is not None:
+            df["value"] = df["value"].apply(conversion_func)
+        with gzip.open(output_file_path, "wt", compresslevel=FAST_COMPRESSLEVEL) as f:
+            df[["hex", "value"]].to_csv(f, header=True, index=False)
         print(f"Results written to {output_file_path}")
 
 
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The modules are run from within the monkeygod folder rather than installed
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), "monkeygod"))
@@ -0,0 +1,114 @@
+import h3.api.numpy_int as h3i
+import numpy as np
+import pandas as pd
+import pytest
+
+import friction_h3_traversal as traversal
+
+
+def _grid_graph(rows, cols, seed):
+    """CSR graph of a grid joined to its 4 neighbours, plus an isolated node at the end
+
+    Leaving a node costs the same whichever neighbour is next, as in H3CostGraph."""
+    rng = np.random.default_rng(seed)
+    n = rows * cols
+    cost = rng.integers(1, 1000, n + 1).astype(np.uint16)
+    nbrs = [[] for _ in range(n + 1)]
+    for r in range(rows):
+        for c in range(cols):
+            i = r * cols + c
+            if c + 1 < cols:
+                nbrs[i].append(i + 1)
+                nbrs[i + 1].append(i)
+            if r + 1 < rows:
+                nbrs[i].append(i + cols)
+                nbrs[i + cols].append(i)
+    degree = np.array([len(x) for x in nbrs])
+    indptr = np.zeros(n + 2, dtype=np.int64)
+    np.cumsum(degree, out=indptr[1:])
+    indices = np.array([j for x in nbrs for j in x], dtype=np.int32)
+    return indptr, indices, np.repeat(cost, degree), cost[indices], cost
+
+
+INDPTR, INDICES, WEIGHTS, REVERSE_WEIGHTS, COSTS = _grid_graph(12, 15, seed=0)
+ISOLATED = len(COSTS) - 1
+BOUNDS = (int(COSTS.min()), int(COSTS.max()))
+
+
+def _path_cost(came_from, start, goal):
+    """Walk ``came_from`` back from ``goal`` to ``start``, totalling the edges taken"""
+    total, current = 0, goal
+    while current != start:
+        previous = came_from[current]
+        edges = np.arange(INDPTR[previous], INDPTR[previous + 1])
+        edge = edges[INDICES[edges] == current]
+        assert edge.size == 1, f"{previous} and {current} aren't neighbours"
+        total += WEIGHTS[edge[0]]
+        current = previous
+    return total
+
+
+def _searches(start, goal):
+    _, forward_costs = traversal.dijkstra_csr(INDPTR, INDICES, WEIGHTS, *BOUNDS, start, goal)
+    came_from, costs = traversal.bidirectional_dijkstra_csr(
+        INDPTR, INDICES, WEIGHTS, REVERSE_WEIGHTS, *BOUNDS, start, goal
+    )
+    return forward_costs[goal], came_from, costs[goal]
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_bidirectional_matches_dijkstra(seed):
+    rng = np.random.default_rng(seed)
+    for start, goal in rng.integers(0, ISOLATED, (20, 2)):
+        expected, came_from, cost = _searches(start, goal)
+        assert cost == expected
+        assert _path_cost(came_from, start, goal) == cost
+
+
+def test_bidirectional_start_is_goal():
+    expected, came_from, cost = _searches(7, 7)
+    assert expected == cost == 0
+    assert came_from[7] == -1
+
+
+def test_bidirectional_unreachable_goal():
+    expected, came_from, cost = _searches(0, ISOLATED)
+    assert expected == cost == np.inf
+    assert came_from[ISOLATED] == -1
+
+
+@pytest.fixture(scope="module")
+def graph():
+    hexes = h3i.k_ring(h3i.geo_to_h3(16.0, -90.0, 7), 6).astype(np.uint64)
+    values = np.random.default_rng(1).integers(1, 1000, len(hexes)).astype(np.uint16)
+    return traversal.H3CostGraph(pd.DataFrame({"hex": hexes, "value": values}))
+
+
+def test_bidirectional_dijkstra_matches_dijkstra_search(graph):
+    start, goal = graph.hexes[0].item(), graph.hexes[-1].item()
+    came_from, cost_so_far = traversal.bidirectional_dijkstra(graph, start, goal)
+    assert cost_so_far[goal] == traversal.dijkstra_search(graph, start, hex_goal=goal)[1][goal]
+    path = traversal.reconstruct_path(came_from, cost_so_far, start, goal)
+    assert all(a in graph.neighbors(b) for a, b in zip(list(path), list(path)[1:]))
+
+
+def test_bidirectional_dijkstra_goal_off_surface(graph):
+    start, goal = graph.hexes[0].item(), h3i.geo_to_h3(0.0, 0.0, 7)
+    assert traversal.bidirectional_dijkstra(graph, start, goal) == ({start: None}, {start: 0.0})
+    assert traversal.dijkstra_to_hex(graph, start, goal) == ({start: None}, {start: 0.0})
+    cost_so_far = traversal.dijkstra_search(graph, start, hex_goal=goal, distance_goal=30)[1]
+    assert cost_so_far == traversal.dijkstra_isochrone(graph, start, 30)[1]
+
+
+def test_start_off_surface(graph):
+    with pytest.raises(ValueError):
+        traversal.bidirectional_dijkstra(graph, h3i.geo_to_h3(0.0, 0.0, 7), graph.hexes[0].item())
+
+
+def test_dijkstra_isochrone_stops_at_max_cost(graph):
+    start = graph.hexes[0].item()
+    everything = traversal.dijkstra_isochrone(graph, start, np.inf)[1]
+    max_cost = sorted(everything.values())[len(everything) // 2]
+    came_from, cost_so_far = traversal.dijkstra_isochrone(graph, start, max_cost)
+    assert cost_so_far == {h: c for h, c in everything.items() if c <= max_cost}
+    assert came_from.keys() == cost_so_far.keys()
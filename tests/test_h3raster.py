@@ -0,0 +1,81 @@
+import h3
+import numpy as np
+import pandas as pd
+import pytest
+import rasterio
+from rasterio.transform import Affine
+from rasterio.windows import Window
+
+import h3raster
+
+H3_RES = 7
+TRANSFORM = Affine(0.01, 0, -90.3, 0, -0.01, 16.2)
+
+
+def _write_raster(path, block_shape, transform=TRANSFORM):
+    """Write a 40 x 50 cell raster of random values, in blocks of ``block_shape``"""
+    data = np.random.default_rng(0).uniform(1, 100, (40, 50)).astype(np.float32)
+    profile = dict(driver="GTiff", width=50, height=40, count=1, dtype="float32")
+    if block_shape[0] > 1:
+        profile.update(tiled=True, blockysize=block_shape[0], blockxsize=block_shape[1])
+    else:
+        profile.update(blockysize=1)
+    with rasterio.open(path, "w", crs="EPSG:4326", transform=transform, **profile) as dst:
+        dst.write(data, 1)
+    return path
+
+
+def _reference(path, method, window):
+    """Resample each cell in ``window`` into its hexagon one at a time"""
+    with rasterio.open(path) as src:
+        window = window.intersection(Window(0, 0, src.width, src.height))
+        data = src.read(1, window=window)
+    cells = {}
+    for row in range(data.shape[0]):
+        for col in range(data.shape[1]):
+            lon, lat = TRANSFORM * (window.col_off + col + 0.5, window.row_off + row + 0.5)
+            cells.setdefault(h3.geo_to_h3(lat, lon, H3_RES), []).append(float(data[row, col]))
+    reduce = {"sum": sum, "avg": lambda v: sum(v) / len(v), "max": max, "min": min}[method]
+    return {hex: reduce(values) for hex, values in cells.items()}
+
+
+def _convert(monkeypatch, tmp_path, path, method, top_left=None, bottom_right=None):
+    """Run create_h3_from_raster in small tiles, returning its CSV as ``{hex: value}``"""
+    monkeypatch.setattr(h3raster, "DATA_DIR", str(tmp_path))
+    monkeypatch.setattr(h3raster, "TILE_CELLS", 300)
+    h3raster.RasterH3Converter().create_h3_from_raster(
+        str(path), method, top_left, bottom_right, h3_res=H3_RES, max_workers=2
+    )
+    df = pd.read_csv(tmp_path / "raster.gz")
+    return dict(zip(df["hex"], df["value"]))
+
+
+@pytest.mark.parametrize("block_shape", [(16, 16), (1, 50)], ids=["tiled", "striped"])
+@pytest.mark.parametrize("method", ["sum", "avg", "max", "min"])
+def test_create_h3_from_raster_matches_per_cell(monkeypatch, tmp_path, block_shape, method):
+    path = _write_raster(tmp_path / "raster.tif", block_shape)
+    expected = _reference(path, method, Window(0, 0, 50, 40))
+    assert _convert(monkeypatch, tmp_path, path, method) == pytest.approx(expected)
+
+
+@pytest.mark.parametrize("method", ["sum", "avg"])
+def test_create_h3_from_raster_window(monkeypatch, tmp_path, method):
+    path = _write_raster(tmp_path / "raster.tif", (16, 16))
+    top_left, bottom_right = (16.13, -90.21), (15.87, -89.9)
+    with rasterio.open(path) as src:
+        window = h3raster.RasterH3Converter.lat_lon_to_window(top_left, bottom_right, src)
+    expected = _reference(path, method, window)
+    assert _convert(monkeypatch, tmp_path, path, method, top_left, bottom_right) == (
+        pytest.approx(expected)
+    )
+
+
+def test_create_h3_from_raster_empty_window(monkeypatch, tmp_path):
+    path = _write_raster(tmp_path / "raster.tif", (16, 16))
+    assert _convert(monkeypatch, tmp_path, path, "sum", (1.1, 1.0), (1.0, 1.1)) == {}
+
+
+def test_create_h3_from_raster_rotated(monkeypatch, tmp_path):
+    path = _write_raster(tmp_path / "raster.tif", (16, 16), TRANSFORM * Affine.rotation(10))
+    with pytest.raises(ValueError):
+        _convert(monkeypatch, tmp_path, path, "sum")